@@ -1,18 +1,32 @@
-import requests
 import logging
-import pandas as pd
-import numpy as np
 import zipfile
 import io
+import re
+import json
+import hashlib
+import multiprocessing
 
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
 
-from credentials import ENTSOE_TOKEN
+from datetime import datetime, timedelta, time
+
+from class_library import lazy_import
 from class_library import EntsoeCodes
 from class_library import TimeZoneManager
+from class_library import TimeSeriesManager
+from class_library import BackfillJournal
+from class_library import RateLimiter
+from class_library import PublicationSchedule
+from class_library import Diagnostics
+from class_library import DataValidator
+from class_library import PayloadArchive
 from class_library import SQLManager
 
+requests = lazy_import('requests')
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+bs4 = lazy_import('bs4')
+credentials = lazy_import('credentials')
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,21 +34,134 @@ logger = logging.getLogger(__name__)
 
 
 class DataManager():
-    def __init__(self,schema,local_timezone) -> None:
+    def __init__(self,schema,local_timezone,offline=False) -> None:
         self.entsoe_codes=EntsoeCodes()
         self.timezone_manager=TimeZoneManager(local_timezone)
+        self.time_series_manager=TimeSeriesManager(local_timezone)
         self.sql_manager=SQLManager()
+        self.journal=BackfillJournal()
+        self.rate_limiter=RateLimiter.get_shared()
+        self.diagnostics=Diagnostics.get_shared()
+        self.validator=DataValidator(self.time_series_manager)
+        self.archive=PayloadArchive.get_shared()
+        # offline: responses are served from the payload archive, the ENTSO-E API is never called
+        self.offline=offline
+        self.max_attempts=5
         self.data_start_date=datetime(2019,12,31,23,0)
         self.schema_name=schema
         self.area_code=self.entsoe_codes.Areas.dict[schema]
         self.ccgts=self.entsoe_codes.CCGTs.dict[schema]
         self.UTC_column="UTC"
-        self.base_url=f"https://web-api.tp.entsoe.eu/api?securityToken={ENTSOE_TOKEN}"
+        # update function and publication schedule of every dataset (day ahead prices after the ~12:45 CET auction, realised data after midnight)
+        self.datasets={
+            'power_price' : (self.update_power_prices, PublicationSchedule(time(12,45), days_ahead=1, fast_interval=timedelta(minutes=2))),
+            'activated_balancing_energy' : (self.update_activated_balancing_energy, PublicationSchedule(time(0,30), days_ahead=-1, fast_interval=timedelta(minutes=10))),
+            'fuelmix' : (self.update_fuelmix, PublicationSchedule(time(0,30), days_ahead=-1, fast_interval=timedelta(minutes=10))),
+            'actual_total_load' : (self.update_actual_total_load, PublicationSchedule(time(0,30), days_ahead=-1, fast_interval=timedelta(minutes=10))),
+            'powerplant_actual_generation' : (self.update_actual_generation_per_unit, PublicationSchedule(time(0,30), days_ahead=-1, fast_interval=timedelta(minutes=10))),
+        }
+        self.next_poll={}
+        # local date of the last revision refresh of every dataset in poll
+        self.last_revision_refresh={}
+        # fetch and upload functions of every dataset
+        self.fetchers={
+            'power_price' : (self.__get_power_prices, self.__upload_power_prices),
+            'activated_balancing_energy' : (self.__get_balancing_energy, self.__upload_sql),
+            'fuelmix' : (self.__get_fuelmix, self.__upload_sql),
+            'actual_total_load' : (self.__get_actual_total_load, self.__upload_sql),
+            'powerplant_actual_generation' : (self.__get_ccgt_actual_generation, self.__upload_sql),
+        }
+        # validation rules of every dataset: expected resolution of the rows (prices carry their own) and
+        # column (pattern): (lower bound, upper bound, max null ratio)
+        # mFRR and balancing prices only cover activated intervals, a few missing fuelmix and unit intervals are filled with 0s,
+        # psr types and units not in the response at all are filled with 0s and reported as warnings
+        self.validation_rules={
+            'power_price' : {'resolution': None, 'columns': {'DA_price': (-500, 10000, 0.0)}},
+            'activated_balancing_energy' : {'resolution': 'PT15M', 'columns': {'*_price': (-15000, 15000, 1.0), 'down_mfrr': (-10000, 0, 1.0), 'up_mfrr': (0, 10000, 1.0), 'down_*': (-10000, 0, 0.0), 'up_*': (0, 10000, 0.0)}},
+            'fuelmix' : {'resolution': 'PT15M', 'columns': {'*': (0, 100000, 0.05)}},
+            'actual_total_load' : {'resolution': 'PT15M', 'columns': {'Actual_load': (0, 200000, 0.0)}},
+            'powerplant_actual_generation' : {'resolution': 'PT60M', 'columns': {'*': (-100, 2000, 0.05)}},
+        }
+        # tables with hourly, daily and monthly aggregates refreshed after every upload
+        self.aggregated_tables=['power_price','fuelmix','activated_balancing_energy']
+        # partitioning interval of every table on "UTC", tables with 15 minute rows are split by month
+        self.partition_intervals={
+            'power_price' : 'year',
+            'power_price_native' : 'month',
+            'activated_balancing_energy' : 'month',
+            'fuelmix' : 'year',
+            'actual_total_load' : 'year',
+            'powerplant_actual_generation' : 'month',
+        }
+        # archived document of every dataset, its windows are the windows of the reprocessing
+        self.document_types={
+            'power_price' : self.entsoe_codes.DocumentType.Price_Document,
+            'activated_balancing_energy' : self.entsoe_codes.DocumentType.Activated_balancing_quantities,
+            'fuelmix' : self.entsoe_codes.DocumentType.Actual_generation_per_type,
+            'actual_total_load' : self.entsoe_codes.DocumentType.System_total_load,
+            'powerplant_actual_generation' : self.entsoe_codes.DocumentType.Actual_generation,
+        }
+        # payload digests of the current window, saved once the window is committed
+        self.pending_digests={}
+        # table and UTC bounds of the current window, with force its payloads are parsed even if unchanged
+        self.current_window=None
+        self.force=False
+
+    @property
+    def base_url(self):
+        return f"https://web-api.tp.entsoe.eu/api?securityToken={credentials.ENTSOE_TOKEN}"
 
     def __get_entsoe_response(self,params):
-        '''Basic function to get any response from ENTSO-E API with given parameters'''
+        '''Basic function to get any response from ENTSO-E API with given parameters, successful payloads are archived.
+        Offline the response is served from the payload archive.'''
+        response=self.__get_archived_response(params) if self.offline else self.__request_entsoe_response(params)
+
+        # createdDateTime is the time of the API call, it is left out of the digest
+        response.digest_key = f"{self.schema_name}:{json.dumps(params, sort_keys=True)}"
+        response.digest = hashlib.sha256(re.sub(rb'<createdDateTime>[^<]*</createdDateTime>', b'', response.content)).hexdigest()
+        self.pending_digests[response.digest_key] = response.digest
+        if not self.offline and response.ok:
+            try:
+                self.archive.append(self.schema_name,params,response.content,response.digest)
+            except Exception as e:
+                logger.warning(f"Error while archiving {self.schema_name} {params.get('documentType')} {params.get('periodStart')}-{params.get('periodEnd')}: {e}")
+        return response
+
+    def __get_archived_response(self,params):
+        '''Returns the archived payload of a request as a response'''
+        content=self.archive.get(self.schema_name,params)
+        if content is None:
+            raise LookupError(f"{self.schema_name} {params.get('documentType')} {params.get('periodStart')}-{params.get('periodEnd')} is not in the payload archive")
+        response = requests.models.Response()
+        response._content = content
+        response.status_code = 200
+        response.headers = {'Content-Type': 'application/xml'}
+        return response
+
+    def __request_entsoe_response(self,params):
+        '''Requests the ENTSO-E API, zipped payloads are extracted'''
         try:
-            response = requests.get(self.base_url, params=params)
+            # every request waits for the shared rate limiter, throttling and outages pause all callers
+            for attempt in range(self.max_attempts):
+                self.rate_limiter.acquire()
+                try:
+                    response = requests.get(self.base_url, params=params, timeout=120)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    self.rate_limiter.on_failure()
+                    logger.warning(f"ENTSO-E API CALL failed (attempt {attempt+1}/{self.max_attempts}): {e}")
+                    if attempt == self.max_attempts-1:
+                        raise
+                    continue
+
+                if response.status_code == 429:
+                    self.rate_limiter.on_throttled(response.headers.get('Retry-After'))
+                elif response.status_code >= 500:
+                    self.rate_limiter.on_failure()
+                    logger.warning(f"ENTSO-E API CALL failed (attempt {attempt+1}/{self.max_attempts}): {response.status_code}")
+                else:
+                    self.rate_limiter.on_success()
+                    break
+
             response.raise_for_status()
 
             # HANDLE ZIP FILES
@@ -58,15 +185,40 @@ class DataManager():
                         raise ValueError("No XML file found in the ZIP archive")
 
         except requests.exceptions.HTTPError:
-            soup = BeautifulSoup(response.text, 'xml')
-            logger.error(f"ENTSO-E API CALL Error: {response.status_code}, {soup.find('Reason').find('text').text}")
+            soup = bs4.BeautifulSoup(response.text, 'xml')
+            logger.error(f"ENTSO-E API CALL Error: {response.status_code}, {self.__get_reason(soup)}")
         return response
 
-    def __upload_sql(self,df,table_name,periodStart_localtz,periodEnd_localtz):
+    def __get_reason(self,soup):
+        '''Returns the Reason text of an acknowledgement document, empty if there is none'''
+        reason=soup.find('Reason')
+        if reason is None or reason.find('text') is None:
+            return ''
+        return reason.find('text').text
+
+    def __is_not_published(self,soup):
+        '''Checks if the response is the acknowledgement of a request without matching data, e.g. prices before the auction results'''
+        return soup.find('Acknowledgement_MarketDocument') is not None and 'No matching data' in self.__get_reason(soup)
+
+    def __is_unchanged(self,*responses):
+        '''Checks if the payloads of the responses are the same as at the last committed fetch of their window and its rows still exist.
+        Archived payloads and forced windows are always parsed.'''
+        if self.offline or self.force:
+            return False
+        if not all(self.journal.get_digest(response.digest_key) == response.digest for response in responses):
+            return False
+        # rows deleted since the last commit are loaded again
+        table_name,periodStart,periodEnd=self.current_window
+        return self.sql_manager.has_rows(self.schema_name,table_name,datetime.strptime(periodStart,'%Y%m%d%H%M'),datetime.strptime(periodEnd,'%Y%m%d%H%M'))
+
+    def __upload_sql(self,df,table_name,periodStart_localtz,periodEnd_localtz,replace=False):
         '''Uploads the dataframe to the SQL table'''
         try:
-            success=self.sql_manager.upload_sql(df,table_name,self.schema_name)
+            success=self.sql_manager.upload_sql(df,table_name,self.schema_name,replace,self.partition_intervals.get(table_name))
             if success:
+                # the window stays uncommitted until its aggregates are refreshed, the next run uploads it again
+                if table_name in self.aggregated_tables and not self.sql_manager.refresh_aggregates(self.schema_name,table_name,df[self.UTC_column].min(),df[self.UTC_column].max(),self.timezone_manager):
+                    return f"Error: {self.schema_name} {table_name} aggregates are not refreshed"
                 logger.info(f"{self.schema_name} {table_name} refreshed successfully! ({periodStart_localtz.strftime('%Y-%m-%d')} - {(periodEnd_localtz+timedelta(-1)).strftime('%Y-%m-%d')})")
                 return "Success"
         except Exception as e:
@@ -74,7 +226,7 @@ class DataManager():
             return f"Error: {e}"
 
     def __get_power_prices(self,periodStart,periodEnd):
-        '''Get the day ahead power prices for Hungary, UTC timezone, fromat: YYYYMMDDhhmm'''
+        '''Get the day ahead power prices for Hungary at native resolution, UTC timezone, fromat: YYYYMMDDhhmm'''
 
         params={
             "documentType" : self.entsoe_codes.DocumentType.Price_Document,
@@ -85,151 +237,143 @@ class DataManager():
             }
 
         response=self.__get_entsoe_response(params)
-        soup=BeautifulSoup(response.text, 'xml')
+        if self.__is_unchanged(response):
+            return None
+        soup=bs4.BeautifulSoup(response.text, 'xml')
+        if self.__is_not_published(soup):
+            logger.info(f"{self.schema_name} power prices {periodStart}-{periodEnd} are not published yet")
+            return None
 
         try:
-            prices=[float(price.getText()) for time_series in soup.find_all('TimeSeries') for price in time_series.find_all('price.amount') if time_series.find('resolution').getText() == 'PT60M']
-
-            datetimes_utc = []
-            datetimes_local = []
-            start_date_naive = datetime.strptime(periodStart, '%Y%m%d%H%M')
-            start_date = start_date_naive.replace(tzinfo=self.timezone_manager.utc_tz)
-            for hour in range(len(prices)):
-                datetimes_utc.append(start_date + timedelta(hours=hour))
-                datetimes_local.append(start_date.astimezone(self.timezone_manager.local_tz) + timedelta(hours=hour))
+            # every Period is kept at its own resolution (PT60M before, PT15M after the SDAC 15-minute MTU go-live)
+            frames=[self.time_series_manager.get_period_series(time_series,period,'price.amount','DA_price') for time_series in soup.find_all('TimeSeries') for period in time_series.find_all('Period')]
+            df=self.time_series_manager.get_native_series(frames)
+            start_date=pd.Timestamp(datetime.strptime(periodStart, '%Y%m%d%H%M'), tz=self.timezone_manager.utc_tz)
+            end_date=pd.Timestamp(datetime.strptime(periodEnd, '%Y%m%d%H%M'), tz=self.timezone_manager.utc_tz)
+            df=df[(df['UTC'] >= start_date) & (df['UTC'] < end_date)].reset_index(drop=True)
         except Exception as e:
-            logger.error(f"Error while getting power prices: {self.schema_name}: {soup.find('Reason').find('text').text}")
-            prices = []
-            datetimes_utc = []
-            datetimes_local = []
-
-            with open(f'C:\\Users\\Admin\\Projects\\entso-e\\troubleshoot\\power_prices_{periodStart}-{periodEnd}_troubleshoot.xml', 'w') as f:
-                f.write(soup.prettify())
+            logger.error(f"Error while getting power prices: {self.schema_name}: {e} {self.__get_reason(soup)}")
+            df = pd.DataFrame({'UTC': [], 'local_datetime': [], 'resolution': [], 'DA_price': []})
+            self.diagnostics.dump(f'{self.schema_name}_power_prices_{periodStart}-{periodEnd}',params,response.content)
 
-        df = pd.DataFrame({'UTC': datetimes_utc, 'local_datetime': datetimes_local, 'DA_price': prices})
         return df
+
+    def __upload_power_prices(self,df_native,table_name,periodStart_localtz,periodEnd_localtz,replace=False):
+        '''Uploads the prices at their native resolution and the hourly aggregates'''
+        native_result=self.__upload_sql(df_native,f'{table_name}_native',periodStart_localtz,periodEnd_localtz,replace)
+        if not df_native.empty:
+            df_hourly=self.time_series_manager.resample(df_native,'PT60M')
+        else:
+            df_hourly=df_native.drop(columns=['resolution'])
+        hourly_result=self.__upload_sql(df_hourly,table_name,periodStart_localtz,periodEnd_localtz,replace)
+        return hourly_result if native_result == "Success" else native_result
+
+    def __plan_windows(self,periodStart_localtz,periodEnd_localtz):
+        '''Returns the request windows (periodStart, periodEnd, periodStart_localtz, periodEnd_localtz) of a local period.
+        Maximum period is 1 year, if the period is longer, it is divided into 1 day periods'''
+        if periodEnd_localtz - periodStart_localtz < timedelta(days=365):
+            local_windows=[(periodStart_localtz,periodEnd_localtz)]
+        else:
+            local_windows=[(periodStart_localtz+timedelta(days=day),periodStart_localtz+timedelta(days=day+1)) for day in range((periodEnd_localtz - periodStart_localtz).days)]
+        return [(self.timezone_manager.get_utc_time(start).strftime('%Y%m%d%H%M'),self.timezone_manager.get_utc_time(end).strftime('%Y%m%d%H%M'),start,end) for start,end in local_windows]
+
+    def __plan_daily_windows(self,periodStart_localtz,periodEnd_localtz):
+        '''Returns 1 day request windows of a local period, days with 25 hours are split into 23 + 1 hours'''
+        windows=[]
+        for day in range(max((periodEnd_localtz - periodStart_localtz).days,0)):
+            periodStart_i = periodStart_localtz+ timedelta(days=day)
+            periodEnd_i = periodStart_localtz + timedelta(days=day+1)
+            periodStart = self.timezone_manager.get_utc_time(periodStart_i).strftime('%Y%m%d%H%M')
+            periodEnd = self.timezone_manager.get_utc_time(periodEnd_i).strftime('%Y%m%d%H%M')
+
+            # handle days with 25 hours
+            if self.timezone_manager.get_utc_time(periodEnd_i) - self.timezone_manager.get_utc_time(periodStart_i) <= timedelta(hours=24):
+                windows.append((periodStart,periodEnd,periodStart_i,periodEnd_i))
+            elif self.timezone_manager.get_utc_time(periodEnd_i) - self.timezone_manager.get_utc_time(periodStart_i) == timedelta(hours=25):
+                start_hours=[0,23]
+                end_hours=[23,24]
+                logger.info(f"periodStart: {periodStart}, periodEnd: {periodEnd} 25 hours")
+                for i in range(len(start_hours)):
+                    periodStart = self.timezone_manager.get_utc_time(periodStart_i + timedelta(hours=start_hours[i])).strftime('%Y%m%d%H%M')
+                    periodEnd = self.timezone_manager.get_utc_time(periodStart_i + timedelta(hours=end_hours[i])).strftime('%Y%m%d%H%M')
+                    windows.append((periodStart,periodEnd,periodStart_i,periodEnd_i))
+            else:
+                logger.error(f"Error while planning {self.schema_name} windows: {self.timezone_manager.get_utc_time(periodStart_i)} - {self.timezone_manager.get_utc_time(periodEnd_i)}")
+        return windows
+
+    def __run_windows(self,table_name,windows,get_data,upload_data,dataset=None,replace=False,force=False):
+        '''Fetches and uploads the request windows of a dataset, every step is recorded in the backfill journal.
+        Windows left over by an interrupted run come first: committed ones are skipped, fetched ones are uploaded from the journal.
+        Windows whose payloads did not change since their last commit are neither parsed nor uploaded, unless forced.'''
+        dataset=dataset or f"{self.schema_name}.{table_name}"
+        self.journal.plan(dataset,windows)
+        self.force=force
+        for periodStart,periodEnd,periodStart_localtz,periodEnd_localtz in self.journal.get_pending(dataset):
+            self.pending_digests={}
+            self.current_window=(table_name,periodStart,periodEnd)
+            df=self.journal.load_payload(dataset,periodStart,periodEnd)
+            resumed=df is not None
+            if resumed:
+                logger.info(f"{dataset} {periodStart}-{periodEnd} is uploaded from the backfill journal")
+            else:
+                df=get_data(periodStart,periodEnd)
+                # nothing to upload: the payloads are unchanged since the last fetch or not published yet
+                if df is None:
+                    logger.info(f"{dataset} {periodStart}-{periodEnd} has nothing new to upload")
+                    self.journal.commit(dataset,periodStart,periodEnd)
+                    continue
+
+                # failing windows are quarantined and fetched again with a growing delay, until they are marked failed
+                validation=self.validator.validate(df,periodStart,periodEnd,self.validation_rules[table_name])
+                self.journal.record_validation(dataset,periodStart,periodEnd,validation)
+                if validation['warnings']:
+                    logger.warning(f"{dataset} {periodStart}-{periodEnd}: {'; '.join(validation['warnings'])}")
+                if not validation['passed']:
+                    if self.journal.quarantine(dataset,periodStart,periodEnd) == self.journal.FAILED:
+                        logger.error(f"{dataset} {periodStart}-{periodEnd} failed the validation {self.journal.MAX_ATTEMPTS} times, it is not fetched again until retried: {'; '.join(validation['issues'])}")
+                    else:
+                        logger.warning(f"{dataset} {periodStart}-{periodEnd} quarantined: {'; '.join(validation['issues'])}")
+                    continue
+                df=df.fillna(0)
+                self.journal.save_payload(dataset,periodStart,periodEnd,df)
+
+            # a resumed window may have been uploaded before the interruption, its rows are replaced
+            if upload_data(df,table_name,periodStart_localtz,periodEnd_localtz,replace=replace or resumed) == "Success":
+                self.journal.commit(dataset,periodStart,periodEnd)
+                self.journal.save_digests(self.pending_digests)
+        self.journal.finish(dataset)
     
+    def __select_series(self,soup,business_type,flow_direction):
+        '''Returns the TimeSeries of a document with the given businessType (None: any) and flowDirection'''
+        return [time_series for time_series in soup.find_all('TimeSeries')
+                if (business_type is None or time_series.find('businessType').getText() == business_type)
+                and time_series.find('flowDirection.direction').getText() == flow_direction]
+
     def __get_balancing_energy(self,periodStart,periodEnd):
         '''Get the activated balancing energy for Hungary in MW, UTC timezone, fromat: YYYYMMDDhhmm'''
+        window_start = datetime.strptime(periodStart, '%Y%m%d%H%M')
+        window_end = datetime.strptime(periodEnd, '%Y%m%d%H%M')
+        # balancing market time unit, replaced by the resolution of the response
+        RESOLUTION = timedelta(minutes=15)
+
         # DOMESTIC ACTIVATED BALANCING ENERGY
-        params={
+        quantity_params={
             "documentType" : self.entsoe_codes.DocumentType.Activated_balancing_quantities,
             "controlArea_Domain" : self.area_code,
             "periodStart" : periodStart,
             "periodEnd" : periodEnd
             }
 
-        response=self.__get_entsoe_response(params)
-        soup=BeautifulSoup(response.text, 'xml')
-        
-        try:
-            RESOLUTION = timedelta(minutes=int(soup.find('resolution').getText().split('T')[1].split('M')[0]))
-            period_start_date = datetime.strptime(soup.find('period.timeInterval').find('start').getText(), '%Y-%m-%dT%H:%MZ') 
-            period_end_date = datetime.strptime(soup.find('period.timeInterval').find('end').getText(), '%Y-%m-%dT%H:%MZ')  
-
-            datetimes_utc_wo_tz = [period_start_date + RESOLUTION * i for i in range(int((period_end_date - period_start_date) / RESOLUTION))]
-            datetimes_utc=[time.replace(tzinfo=self.timezone_manager.utc_tz) for time in datetimes_utc_wo_tz]
-            datetimes_local = []
-            for quarter_hour in datetimes_utc:
-                datetimes_local.append(quarter_hour.astimezone(self.timezone_manager.local_tz))
-
-            afrr_down = np.array([-4*int(activated_energy.find('quantity').getText()) for time_series in soup.find_all('TimeSeries')
-                            for period in time_series.find_all('Period')
-                            for activated_energy in period.find_all('Point')
-                            if time_series.find('businessType').getText() == self.entsoe_codes.BusinessType.Automatic_frequency_restoration_reserve
-                            and time_series.find('flowDirection.direction').getText() == self.entsoe_codes.FlowDirection.Down])
-
-            afrr_up = np.array([4*int(activated_energy.find('quantity').getText()) for time_series in soup.find_all('TimeSeries')
-                            for period in time_series.find_all('Period')
-                            for activated_energy in period.find_all('Point')
-                            if time_series.find('businessType').getText() == self.entsoe_codes.BusinessType.Automatic_frequency_restoration_reserve
-                            and time_series.find('flowDirection.direction').getText() == self.entsoe_codes.FlowDirection.Up])
-
-            mfrr_down = np.array([-4*int(activated_energy.find('quantity').getText()) for time_series in soup.find_all('TimeSeries')
-                            for period in time_series.find_all('Period')
-                            for activated_energy in period.find_all('Point')
-                            if time_series.find('businessType').getText() == self.entsoe_codes.BusinessType.Manual_frequency_restoration_reserve
-                            and time_series.find('flowDirection.direction').getText() == self.entsoe_codes.FlowDirection.Down])
-
-            mfrr_up = np.array([4*int(activated_energy.find('quantity').getText()) for time_series in soup.find_all('TimeSeries')
-                            for period in time_series.find_all('Period')
-                            for activated_energy in period.find_all('Point')
-                            if time_series.find('businessType').getText() == self.entsoe_codes.BusinessType.Manual_frequency_restoration_reserve
-                            and time_series.find('flowDirection.direction').getText() == self.entsoe_codes.FlowDirection.Up])
-            
-        except Exception as e:
-            logger.error(f"Error while getting {self.schema_name} activated balancing energy: {e} {soup.find('Reason').find('text').text}")
-            afrr_down = np.zeros(len(datetimes_utc))
-            mfrr_down = np.zeros(len(datetimes_utc))
-            afrr_up = np.zeros(len(datetimes_utc))
-            mfrr_up = np.zeros(len(datetimes_utc))
-
-            with open(f'C:\\Users\\Admin\\Projects\\entso-e\\troubleshoot\\activated_balancing_energy_{periodStart}-{periodEnd}_troubleshoot.xml', 'w') as f:
-                f.write(soup.prettify())
-        
-        # check if the arrays have the same length, if not add zeros
-        arrays_dict = {'afrr_down': afrr_down, 'mfrr_down': mfrr_down,'afrr_up': afrr_up, 'mfrr_up': mfrr_up}
-        len_utc=len(datetimes_utc)
-        for name, array in arrays_dict.items():
-            if len_utc > len(array):
-                logger.warning(f"{name} length: {len(array)}, adding {len_utc - len(array)} zeros")
-                arrays_dict[name] = np.pad(array, (0, len_utc - len(array)), mode='constant')
-        afrr_down, mfrr_down, afrr_up, mfrr_up = arrays_dict['afrr_down'], arrays_dict['mfrr_down'], arrays_dict['afrr_up'], arrays_dict['mfrr_up']
-
-
         # TOTAL IMBALANCE VOLUME
-        params={
+        imbalance_params={
             "documentType" : self.entsoe_codes.DocumentType.Imbalance_volume,
             "controlArea_Domain" : self.area_code,
             "periodStart" : periodStart,
             "periodEnd" : periodEnd
             }
 
-        response=self.__get_entsoe_response(params)
-        soup=BeautifulSoup(response.text, 'xml')
-        
-        try:
-            RESOLUTION=timedelta(minutes=int(soup.find('resolution').getText().split('T')[1].split('M')[0]))
-            period_start = datetime.strptime(soup.find('period.timeInterval').find('start').getText(),'%Y-%m-%dT%H:%MZ')
-            period_end=datetime.strptime(soup.find('period.timeInterval').find('end').getText(),'%Y-%m-%dT%H:%MZ')
-
-            total_imbalance_down = {}
-            for ts in soup.find_all('TimeSeries'):
-                if ts.find('businessType').getText() == self.entsoe_codes.BusinessType.Balance_energy_deviation and ts.find('flowDirection.direction').getText() == self.entsoe_codes.FlowDirection.Down:
-                    for period in ts.find_all('Period'):
-                        for point in period.find_all('Point'):
-                            total_imbalance_down[datetime.strptime(period.find('start').getText(),'%Y-%m-%dT%H:%MZ')+(int(point.find('position').getText())-1)*RESOLUTION]=-4*int(point.find('quantity').getText())
-            
-            total_imbalance_up = {}
-            for ts in soup.find_all('TimeSeries'):
-                if ts.find('businessType').getText() == self.entsoe_codes.BusinessType.Balance_energy_deviation and ts.find('flowDirection.direction').getText() == self.entsoe_codes.FlowDirection.Up:                   
-                    for period in ts.find_all('Period'):
-                        for point in period.find_all('Point'):
-                            total_imbalance_up[datetime.strptime(period.find('start').getText(),'%Y-%m-%dT%H:%MZ')+(int(point.find('position').getText())-1)*RESOLUTION]=4*int(point.find('quantity').getText())
-
-            time_index = period_start
-            while time_index < period_end:
-                if time_index not in total_imbalance_down:
-                    total_imbalance_down[time_index] = 0
-                if time_index not in total_imbalance_up:
-                    total_imbalance_up[time_index] = 0
-                time_index += RESOLUTION
-            
-            igcc_down= np.minimum(0,np.array([total_imbalance_down[time] for time in datetimes_utc_wo_tz]) - afrr_down - mfrr_down)
-            igcc_up = np.maximum(0,np.array([total_imbalance_up[time] for time in datetimes_utc_wo_tz]) - afrr_up - mfrr_up)
-
-        except Exception as e:
-            logger.error(f"Error while getting total {self.schema_name} imbalance volume: {e}")
-            igcc_down = np.zeros(len(datetimes_utc))
-            igcc_up = np.zeros(len(datetimes_utc))
-            
-            with open(f'C:\\Users\\Admin\\Projects\\entso-e\\troubleshoot\\total_imbalance_{periodStart}-{periodEnd}_troubleshoot.xml', 'w') as f:
-                f.write(soup.prettify())
-
-
         # PRICES OF ACTIVATED DOMESTIC BALANCING ENERGY
-        
-        params={
+        price_params={
             "documentType" : self.entsoe_codes.DocumentType.Activated_balancing_prices,
             "controlArea_Domain" : self.area_code,
             "businessType" : self.entsoe_codes.BusinessType.Automatic_frequency_restoration_reserve,
@@ -237,26 +381,79 @@ class DataManager():
             "periodEnd" : periodEnd
             }
 
-        response=self.__get_entsoe_response(params)
-        soup=BeautifulSoup(response.text, 'xml')
+        # all three documents are fetched before parsing, the window is skipped if none of them changed
+        quantity_response=self.__get_entsoe_response(quantity_params)
+        imbalance_response=self.__get_entsoe_response(imbalance_params)
+        price_response=self.__get_entsoe_response(price_params)
+        if self.__is_unchanged(quantity_response,imbalance_response,price_response):
+            return None
+
+        # a document that fails to parse leaves the window empty, it is quarantined by the validation
+        empty = pd.DataFrame({'UTC': [], 'local_datetime': []})
+        soup=bs4.BeautifulSoup(quantity_response.text, 'xml')
+        
+        try:
+            if not soup.find_all('TimeSeries'):
+                raise ValueError("No TimeSeries in the response")
+            RESOLUTION = self.time_series_manager.get_finest_resolution(soup)
+            afrr = self.entsoe_codes.BusinessType.Automatic_frequency_restoration_reserve
+            mfrr = self.entsoe_codes.BusinessType.Manual_frequency_restoration_reserve
+            down = self.entsoe_codes.FlowDirection.Down
+            up = self.entsoe_codes.FlowDirection.Up
+
+            # intervals not covered by the response are left NaN for the validation, filled with 0s before the upload
+            afrr_down = -self.time_series_manager.get_document_array(self.__select_series(soup,afrr,down),'quantity',window_start,window_end,RESOLUTION,energy_to_power=True)
+            afrr_up = self.time_series_manager.get_document_array(self.__select_series(soup,afrr,up),'quantity',window_start,window_end,RESOLUTION,energy_to_power=True)
+            mfrr_down = -self.time_series_manager.get_document_array(self.__select_series(soup,mfrr,down),'quantity',window_start,window_end,RESOLUTION,energy_to_power=True)
+            mfrr_up = self.time_series_manager.get_document_array(self.__select_series(soup,mfrr,up),'quantity',window_start,window_end,RESOLUTION,energy_to_power=True)
+            
+        except Exception as e:
+            logger.error(f"Error while getting {self.schema_name} activated balancing energy: {e} {self.__get_reason(soup)}")
+            self.diagnostics.dump(f'{self.schema_name}_activated_balancing_energy_{periodStart}-{periodEnd}',quantity_params,quantity_response.content)
+            return empty
 
+
+        # TOTAL IMBALANCE VOLUME
+        soup=bs4.BeautifulSoup(imbalance_response.text, 'xml')
+        
         try:
-            price_down_dict={point.find("position").getText() : point.find("activation_Price.amount").getText() for time_series in soup.find_all('TimeSeries') for point in time_series.find_all('Point') if time_series.find('flowDirection.direction').getText() == self.entsoe_codes.FlowDirection.Down}
-            price_up_dict={point.find("position").getText() : point.find("activation_Price.amount").getText() for time_series in soup.find_all('TimeSeries') for point in time_series.find_all('Point') if time_series.find('flowDirection.direction').getText() == self.entsoe_codes.FlowDirection.Up}
+            if not soup.find_all('TimeSeries'):
+                raise ValueError("No TimeSeries in the response")
+            deviation = self.entsoe_codes.BusinessType.Balance_energy_deviation
+            total_imbalance_down = -self.time_series_manager.get_document_array(self.__select_series(soup,deviation,self.entsoe_codes.FlowDirection.Down),'quantity',window_start,window_end,RESOLUTION,energy_to_power=True)
+            total_imbalance_up = self.time_series_manager.get_document_array(self.__select_series(soup,deviation,self.entsoe_codes.FlowDirection.Up),'quantity',window_start,window_end,RESOLUTION,energy_to_power=True)
+
+            # mFRR is only reported for the activated intervals, the rest of the imbalance is netted by IGCC
+            igcc_down= np.minimum(0,total_imbalance_down - afrr_down - np.nan_to_num(mfrr_down))
+            igcc_up = np.maximum(0,total_imbalance_up - afrr_up - np.nan_to_num(mfrr_up))
+
         except Exception as e:
-            logger.error(f"Error while getting {self.schema_name} prices of activated AFRR balancing energy: {e}")
-            price_down_dict = {}
-            price_up_dict = {}
+            logger.error(f"Error while getting total {self.schema_name} imbalance volume: {e} {self.__get_reason(soup)}")
+            self.diagnostics.dump(f'{self.schema_name}_total_imbalance_{periodStart}-{periodEnd}',imbalance_params,imbalance_response.content)
+            return empty
+
+
+        # PRICES OF ACTIVATED DOMESTIC BALANCING ENERGY
+        soup=bs4.BeautifulSoup(price_response.text, 'xml')
 
-        # check if the dictionaries have all values in range len_utc, if not add zeros
-        price_down = np.array([float(price_down_dict.get(str(i+1), 0)) for i in range(len(datetimes_utc))])
-        price_up = np.array([float(price_up_dict.get(str(i+1), 0)) for i in range(len(datetimes_utc))])
+        # positions not covered by any price are left NaN, prices are only published for activated intervals
+        try:
+            if not soup.find_all('TimeSeries'):
+                raise ValueError("No TimeSeries in the response")
+            price_down = self.time_series_manager.get_document_array(self.__select_series(soup,None,self.entsoe_codes.FlowDirection.Down),'activation_Price.amount',window_start,window_end,RESOLUTION,how='last')
+            price_up = self.time_series_manager.get_document_array(self.__select_series(soup,None,self.entsoe_codes.FlowDirection.Up),'activation_Price.amount',window_start,window_end,RESOLUTION,how='last')
+        except Exception as e:
+            logger.error(f"Error while getting {self.schema_name} prices of activated AFRR balancing energy: {e} {self.__get_reason(soup)}")
+            self.diagnostics.dump(f'{self.schema_name}_activated_balancing_prices_{periodStart}-{periodEnd}',price_params,price_response.content)
+            return empty
 
-        df = pd.DataFrame({'UTC': datetimes_utc, 'local_datetime': datetimes_local, 'down_afrr': afrr_down, 'down_igcc': igcc_down, 'down_mfrr': mfrr_down, 'up_afrr': afrr_up, 'up_igcc': igcc_up, 'up_mfrr': mfrr_up, 'down_price': price_down, 'up_price': price_up})
+        df = self.time_series_manager.get_window_frame(window_start,window_end,RESOLUTION,{'down_afrr': afrr_down, 'down_igcc': igcc_down, 'down_mfrr': mfrr_down, 'up_afrr': afrr_up, 'up_igcc': igcc_up, 'up_mfrr': mfrr_up, 'down_price': price_down, 'up_price': price_up})
         return df
 
     def __get_fuelmix(self,periodStart,periodEnd):
         '''Get the day ahead power prices for Hungary, UTC timezone, fromat: YYYYMMDDhhmm'''
+        window_start = datetime.strptime(periodStart, '%Y%m%d%H%M')
+        window_end = datetime.strptime(periodEnd, '%Y%m%d%H%M')
 
         params={
             "documentType" : self.entsoe_codes.DocumentType.Actual_generation_per_type,
@@ -267,65 +464,43 @@ class DataManager():
             }
 
         response=self.__get_entsoe_response(params)
-        soup=BeautifulSoup(response.text, 'xml')
+        if self.__is_unchanged(response):
+            return None
+        soup=bs4.BeautifulSoup(response.text, 'xml')
 
         try:
-            RESOLUTION=timedelta(minutes=int(soup.find('resolution').getText().split('T')[1].split('M')[0]))
-            start_datetime = datetime.strptime(soup.find('time_Period.timeInterval').find('start').getText(), '%Y-%m-%dT%H:%MZ')
-            end_datetime = datetime.strptime(soup.find('time_Period.timeInterval').find('end').getText(), '%Y-%m-%dT%H:%MZ')
+            RESOLUTION=self.time_series_manager.get_finest_resolution(soup)
             # response is with codes, need to convert to readable format
             # get db column names (source types)
-            response_production_per_type = {ts.find('psrType').get_text(): [int(quantity.get_text()) for quantity in ts.find_all("quantity")] for ts in soup.find_all('TimeSeries')}
-            response_production_per_type = {self.entsoe_codes.PsrType.dict[key]: response_production_per_type[key] for key in response_production_per_type.keys()}
-            response_ts_max_length = (end_datetime-start_datetime) // RESOLUTION
+            # a psr type with gaps is split into several TimeSeries, its segments are merged into one array
+            series_per_type = {}
+            for time_series in soup.find_all('TimeSeries'):
+                series_per_type.setdefault(self.entsoe_codes.PsrType.dict[time_series.find('psrType').get_text()],[]).append(time_series)
+
+            # not covered intervals are left NaN for the validation, filled with 0s before the upload
+            response_production_per_type = {source_type: self.time_series_manager.get_document_array(series,'quantity',window_start,window_end,RESOLUTION,how='last')
+                                            for source_type, series in series_per_type.items()}
+
             db_source_types = [row.column_name for index, row in self.sql_manager.get_column_names(self.schema_name, 'fuelmix')[2:].iterrows()]
 
-            # filling with 0s if source type not covering the whole period
-            for time_series in soup.find_all('TimeSeries'):
-                start_source_series=datetime.strptime(time_series.find('timeInterval').find('start').get_text(), '%Y-%m-%dT%H:%MZ')
-                end_source_series=datetime.strptime(time_series.find('timeInterval').find('end').get_text(), '%Y-%m-%dT%H:%MZ')
-                source_type = self.entsoe_codes.PsrType.dict[time_series.find('psrType').get_text()]
-                
-                if len(time_series.find_all('quantity')) < response_ts_max_length:
-                    # check if it is already filled with 0s
-                    if len(response_production_per_type[source_type]) < response_ts_max_length:
-                        response_production_per_type[source_type]=np.zeros(response_ts_max_length)
-                    original_response = [int(quantity.get_text()) for quantity in time_series.find_all('quantity')]
-                    i=0
-                    for quantity in original_response:
-                        index=(start_source_series - datetime.strptime(periodStart, '%Y%m%d%H%M')) // RESOLUTION + i
-                        response_production_per_type[source_type][index] = quantity
-                        i+=1
-
-                    with open(f'C:\\Users\\Admin\\Projects\\entso-e\\troubleshoot\\fuelmix_{source_type}_{periodStart}-{periodEnd}_troubleshoot.xml', 'w') as f:
-                        f.write(str(response_production_per_type[source_type]))
-
-            # fill with 0s psr_types that are missing from the response
-            for source_type in db_source_types:
-                if source_type not in response_production_per_type.keys():
-                    response_production_per_type[source_type] = [0 for _ in range(len(response_production_per_type[next(iter(response_production_per_type))]))]
-
-            datetimes_utc = []
-            datetimes_local = []
-            start_date_naive = datetime.strptime(periodStart, '%Y%m%d%H%M')
-            start_date = start_date_naive.replace(tzinfo=self.timezone_manager.utc_tz)
-            for period in range(len(response_production_per_type[next(iter(response_production_per_type))])):
-                datetimes_utc.append(start_date + period*RESOLUTION)
-                datetimes_local.append(start_date.astimezone(self.timezone_manager.local_tz) + period*RESOLUTION)
-        except Exception as e:
-            logger.error(f"Error while getting {self.schema_name} fuelmix: {soup.find('Reason').find('text').text}")
-            response_production_per_type = []
-            datetimes_utc = []
-            datetimes_local = []
+            # fill with 0s psr_types that are missing from the response, the validation reports them as warnings
+            absent_columns = [source_type for source_type in db_source_types if source_type not in response_production_per_type.keys()]
+            for source_type in absent_columns:
+                response_production_per_type[source_type] = np.zeros((window_end - window_start) // RESOLUTION)
 
-            with open(f'C:\\Users\\Admin\\Projects\\entso-e\\troubleshoot\\fuelmix_{periodStart}-{periodEnd}_troubleshoot.xml', 'w') as f:
-                f.write(soup.prettify())
+            df = self.time_series_manager.get_window_frame(window_start,window_end,RESOLUTION,response_production_per_type)
+            df.attrs['absent_columns'] = absent_columns
+        except Exception as e:
+            logger.error(f"Error while getting {self.schema_name} fuelmix: {e} {self.__get_reason(soup)}")
+            df = pd.DataFrame({'UTC': [], 'local_datetime': []})
+            self.diagnostics.dump(f'{self.schema_name}_fuelmix_{periodStart}-{periodEnd}',params,response.content)
 
-        df = pd.DataFrame({'UTC': datetimes_utc, 'local_datetime': datetimes_local, **response_production_per_type})
         return df
     
     def __get_actual_total_load(self,periodStart,periodEnd):
         '''Get the actual total load for Hungary, UTC timezone, fromat: YYYYMMDDhhmm'''
+        window_start = datetime.strptime(periodStart, '%Y%m%d%H%M')
+        window_end = datetime.strptime(periodEnd, '%Y%m%d%H%M')
 
         params={
             "documentType" : self.entsoe_codes.DocumentType.System_total_load,
@@ -336,32 +511,26 @@ class DataManager():
             }
         
         response=self.__get_entsoe_response(params)
-        soup=BeautifulSoup(response.text, 'xml')
+        if self.__is_unchanged(response):
+            return None
+        soup=bs4.BeautifulSoup(response.text, 'xml')
 
         try:
-            RESOLUTION=timedelta(minutes=int(soup.find('resolution').getText().split('T')[1].split('M')[0]))
-            total_load=[int(load.getText()) for load in soup.find_all('quantity')]
-            datetimes_utc = []
-            datetimes_local = []
-            start_date_naive = datetime.strptime(periodStart, '%Y%m%d%H%M')
-            start_date = start_date_naive.replace(tzinfo=self.timezone_manager.utc_tz)
-            for period in range(len(total_load)):
-                datetimes_utc.append(start_date + period*RESOLUTION)
-                datetimes_local.append(start_date.astimezone(self.timezone_manager.local_tz) + period*RESOLUTION)
+            RESOLUTION=self.time_series_manager.get_finest_resolution(soup)
+            total_load=self.time_series_manager.get_document_array(soup.find_all('TimeSeries'),'quantity',window_start,window_end,RESOLUTION)
+            # intervals not yet published are left NaN, the validation quarantines the window until they are
+            df = self.time_series_manager.get_window_frame(window_start,window_end,RESOLUTION,{'Actual_load': total_load})
         except Exception as e:
-            logger.error(f"Error while getting {self.schema_name} actual total load: {soup.find('Reason').find('text').text}")
-            total_load = []
-            datetimes_utc = []
-            datetimes_local = []
+            logger.error(f"Error while getting {self.schema_name} actual total load: {e} {self.__get_reason(soup)}")
+            df = pd.DataFrame({'UTC': [], 'local_datetime': [], 'Actual_load': []})
+            self.diagnostics.dump(f'{self.schema_name}_actual_total_load_{periodStart}-{periodEnd}',params,response.content)
 
-            with open(f'C:\\Users\\Admin\\Projects\\entso-e\\troubleshoot\\actual_total_load_{periodStart}-{periodEnd}_troubleshoot.xml', 'w') as f:
-                f.write(soup.prettify())
-
-        df = pd.DataFrame({'UTC': datetimes_utc, 'local_datetime': datetimes_local, 'Actual_load': total_load})
         return df
 
     def __get_ccgt_actual_generation(self,periodStart,periodEnd):
         '''Get the CCGT actual generation for Hungary, UTC timezone, fromat: YYYYMMDDhhmm'''
+        window_start = datetime.strptime(periodStart, '%Y%m%d%H%M')
+        window_end = datetime.strptime(periodEnd, '%Y%m%d%H%M')
 
         params={
             "documentType" : self.entsoe_codes.DocumentType.Actual_generation,
@@ -372,271 +541,240 @@ class DataManager():
             }
         
         response = self.__get_entsoe_response(params)
-        soup = BeautifulSoup(response.text, 'xml')
+        if self.__is_unchanged(response):
+            return None
+        soup = bs4.BeautifulSoup(response.text, 'xml')
 
         try:
-            RESOLUTION=timedelta(minutes=int(soup.find('resolution').getText().split('T')[1].split('M')[0]))
-            start_datetime = datetime.strptime(soup.find('time_Period.timeInterval').find('start').getText(), '%Y-%m-%dT%H:%MZ')
-            end_datetime = datetime.strptime(soup.find('time_Period.timeInterval').find('end').getText(), '%Y-%m-%dT%H:%MZ')
-
-            response_act_gen_per_unit = {time_series.find('name').getText().encode('latin1').decode('utf-8'): [int(generation.getText()) for generation in time_series.find_all('quantity')] for time_series in soup.find_all('TimeSeries') if time_series.find('PowerSystemResources').find('name').getText().encode('latin1').decode('utf-8') in self.ccgts}
-            response_ts_max_length = (end_datetime-start_datetime) // RESOLUTION
+            RESOLUTION=self.time_series_manager.get_finest_resolution(soup)
 
-            # filling with 0s if source type not covering the whole period
+            # a unit with gaps is split into several TimeSeries, its segments are merged into one array
+            series_per_unit = {}
             for time_series in soup.find_all('TimeSeries'):
-                start_source_series=datetime.strptime(time_series.find('timeInterval').find('start').get_text(), '%Y-%m-%dT%H:%MZ')
-                end_source_series=datetime.strptime(time_series.find('timeInterval').find('end').get_text(), '%Y-%m-%dT%H:%MZ')
                 machine = time_series.find('PowerSystemResources').find('name').getText().encode('latin1').decode('utf-8')
-                
                 if machine in self.ccgts:
-                    # check if it is already filled with 0s               
-                    if len(time_series.find_all('quantity')) < response_ts_max_length:
-                        if len(response_act_gen_per_unit[machine]) < response_ts_max_length:
-                            response_act_gen_per_unit[machine]=np.zeros(response_ts_max_length)
-                        original_response = [int(quantity.get_text()) for quantity in time_series.find_all('quantity')]
-                        i=0
-                        for quantity in original_response:
-                            index=(start_source_series - datetime.strptime(periodStart, '%Y%m%d%H%M')) // RESOLUTION + i
-                            response_act_gen_per_unit[machine][index] = quantity
-                            i+=1
-
-                        with open(f'C:\\Users\\Admin\\Projects\\entso-e\\troubleshoot\\actual_generation_{machine}_{periodStart}-{periodEnd}_troubleshoot.xml', 'w', encoding='utf-8') as f:
-                            f.write(str(response_act_gen_per_unit[machine]))
-                        with open(f'C:\\Users\\Admin\\Projects\\entso-e\\troubleshoot\\actual_generation_{periodStart}-{periodEnd}_troubleshoot.xml', 'w', encoding='utf-8') as f:
-                            f.write(soup.prettify())
-
-            # fill with 0s units that are missing from the response
-            for machine in self.entsoe_codes.CCGTs.dict[self.schema_name]:
-                if machine not in response_act_gen_per_unit.keys():
-                    response_act_gen_per_unit[machine] = [0 for _ in range(len(response_act_gen_per_unit[next(iter(response_act_gen_per_unit))]))]
-
-            datetimes_utc = []
-            datetimes_local = []
-            start_date_naive = datetime.strptime(periodStart, '%Y%m%d%H%M')
-            start_date = start_date_naive.replace(tzinfo=self.timezone_manager.utc_tz)
-            for period in range(len(response_act_gen_per_unit[next(iter(response_act_gen_per_unit))])):
-                datetimes_utc.append(start_date + period*RESOLUTION)
-                datetimes_local.append(start_date.astimezone(self.timezone_manager.local_tz) + period*RESOLUTION)
-        except Exception as e:
-            logger.error(f"Error while getting {self.schema_name} actual generation load: {soup.find('Reason').find('text').text}")
-            response_act_gen_per_unit = {}
-            datetimes_utc = []
-            datetimes_local = []
+                    series_per_unit.setdefault(machine,[]).append(time_series)
 
-            with open(f'C:\\Users\\Admin\\Projects\\entso-e\\troubleshoot\\actual_generation_load_{periodStart}-{periodEnd}_troubleshoot.xml', 'w', encoding='utf-8') as f:
-                f.write(soup.prettify())
+            # not covered intervals are left NaN for the validation, filled with 0s before the upload
+            response_act_gen_per_unit = {machine: self.time_series_manager.get_document_array(series,'quantity',window_start,window_end,RESOLUTION,how='last')
+                                         for machine, series in series_per_unit.items()}
 
-        df = pd.DataFrame({'UTC': datetimes_utc, 'local_datetime': datetimes_local, **response_act_gen_per_unit})
-        return df            
+            if not response_act_gen_per_unit:
+                raise ValueError("No CCGT units in the response")
 
-    def update_power_prices(self):
-        '''Refreshes the power prices from the last updated date until days ahead'''
+            # fill with 0s units that are missing from the response, the validation reports them as warnings
+            absent_columns = [machine for machine in self.entsoe_codes.CCGTs.dict[self.schema_name] if machine not in response_act_gen_per_unit.keys()]
+            for machine in absent_columns:
+                response_act_gen_per_unit[machine] = np.zeros((window_end - window_start) // RESOLUTION)
 
-        # Get the last timestamp from the database
-        # Set the periodStart and periodEnd for day ahead
-        # Convert the local timezone to UTC
-        table_name='power_price'
+            df = self.time_series_manager.get_window_frame(window_start,window_end,RESOLUTION,response_act_gen_per_unit)
+            df.attrs['absent_columns'] = absent_columns
+        except Exception as e:
+            logger.error(f"Error while getting {self.schema_name} actual generation load: {e} {self.__get_reason(soup)}")
+            df = pd.DataFrame({'UTC': [], 'local_datetime': []})
+            self.diagnostics.dump(f'{self.schema_name}_actual_generation_{periodStart}-{periodEnd}',params,response.content)
+
+        return df            
 
+    def __get_period_start(self,table_name):
+        '''Returns the local start of the next period: the day after the last uploaded row,
+        or the end of the windows still in the backfill journal, these are not planned again'''
         last_timestamp=self.sql_manager.get_last_row_element(self.schema_name,table_name,self.UTC_column)
         if last_timestamp is None:
             last_timestamp=self.data_start_date
             logger.warning(f"No data found: {self.schema_name} {table_name}, last_timestamp set to: {last_timestamp}")
-        day_ahead_end = datetime.now() + timedelta(days=2)
-        periodStart_localtz = datetime(last_timestamp.year,last_timestamp.month,last_timestamp.day,0,0) + timedelta(days=1) 
-        periodEnd_localtz = datetime(day_ahead_end.year,day_ahead_end.month,day_ahead_end.day,0,0)
-
-        periodStart=self.timezone_manager.get_utc_time(periodStart_localtz).strftime('%Y%m%d%H%M')
-        periodEnd=self.timezone_manager.get_utc_time(periodEnd_localtz).strftime('%Y%m%d%H%M')
-
-        if periodStart != periodEnd:
-            # Get the power prices from ENTSO-E API, returns a pd dataframe
-            # Maximum period is 1 year, if the period is longer, it is divided into 1 day periods
-            if periodEnd_localtz - periodStart_localtz < timedelta(days=365):
-                df_da_prices=self.__get_power_prices(periodStart,periodEnd)
-                self.__upload_sql(df_da_prices,table_name,periodStart_localtz,periodEnd_localtz)
-
-            else:
-                for day in range((periodEnd_localtz - periodStart_localtz).days):
-                    periodStart_i = periodStart_localtz+ timedelta(days=day)
-                    periodEnd_i = periodStart_localtz + timedelta(days=day+1)
-                    periodStart=self.timezone_manager.get_utc_time(periodStart_i).strftime('%Y%m%d%H%M')
-                    periodEnd=self.timezone_manager.get_utc_time(periodEnd_i).strftime('%Y%m%d%H%M')
-                    
-                    df_da_prices=self.__get_power_prices(periodStart,periodEnd)
-                    self.__upload_sql(df_da_prices,table_name,periodStart_i,periodEnd_i)                
+        periodStart_localtz = datetime(last_timestamp.year,last_timestamp.month,last_timestamp.day,0,0) + timedelta(days=1)
 
-        else:
-            logger.info(f"{self.schema_name} power_prices are up to date! ({(periodStart_localtz+timedelta(-1)).strftime('%Y-%m-%d')})")
+        planned_end=self.journal.get_planned_end(f"{self.schema_name}.{table_name}")
+        if planned_end is not None and planned_end > periodStart_localtz:
+            periodStart_localtz=planned_end
+        return periodStart_localtz
+
+    def plan_windows(self,table_name,periodStart_localtz,periodEnd_localtz,daily=False):
+        '''Returns the request windows of a dataset in a local period [start, end), daily: 1 day windows for every dataset'''
+        if periodStart_localtz >= periodEnd_localtz:
+            return []
+        # Maximum period of the unit generation is    !!! 1 DAY !!!    the period is divided into 1 day periods
+        if daily or table_name == 'powerplant_actual_generation':
+            return self.__plan_daily_windows(periodStart_localtz,periodEnd_localtz)
+        return self.__plan_windows(periodStart_localtz,periodEnd_localtz)
+
+    def plan_update(self,table_name):
+        '''Returns the local period and request windows of the next update of a dataset:
+        from the last updated date until the last published day of its schedule'''
+        periodStart_localtz=self.__get_period_start(table_name)
+        publication_end = datetime.now() + timedelta(days=self.datasets[table_name][1].days_ahead+1)
+        periodEnd_localtz = datetime(publication_end.year,publication_end.month,publication_end.day,0,0)
+        return periodStart_localtz,periodEnd_localtz,self.plan_windows(table_name,periodStart_localtz,periodEnd_localtz)
+
+    def __update(self,table_name,label):
+        '''Fetches and uploads the planned update windows of a dataset'''
+        periodStart_localtz,periodEnd_localtz,windows=self.plan_update(table_name)
+        get_data,upload_data=self.fetchers[table_name]
+        self.__run_windows(table_name,windows,get_data,upload_data)
+
+        if not windows:
+            logger.info(f"{self.schema_name} {label} up to date! ({(periodStart_localtz+timedelta(-1)).strftime('%Y-%m-%d')})")
             return "No new data to update"
 
+    def update_power_prices(self):
+        '''Refreshes the power prices from the last updated date until days ahead'''
+        return self.__update('power_price','power_prices are')
+
     def update_activated_balancing_energy(self):
         '''Refreshes the activated balancing energy from the last updated date until recent data'''
-
-        # Get the last timestamp from the database
-        # Set the periodStart and periodEnd for recent data
-        # Convert the local timezone to UTC
-        table_name='activated_balancing_energy'
-
-        last_timestamp=self.sql_manager.get_last_row_element(self.schema_name,table_name,self.UTC_column)
-        if last_timestamp is None:
-            last_timestamp=self.data_start_date
-            logger.warning(f"No data found: {self.schema_name} {table_name}, last_timestamp set to: {last_timestamp}")
-        today = datetime.now()
-        periodStart_localtz = datetime(last_timestamp.year,last_timestamp.month,last_timestamp.day,0,0) + timedelta(days=1)
-        periodEnd_localtz = datetime(today.year,today.month,today.day,0,0)
-
-        periodStart=self.timezone_manager.get_utc_time(periodStart_localtz).strftime('%Y%m%d%H%M')
-        periodEnd=self.timezone_manager.get_utc_time(periodEnd_localtz).strftime('%Y%m%d%H%M')
-  
-        #  EACH DAY IS RUNNED SEPARATELY (if incorrect mfrr data, fixed by adding 0s to the end of the array) 
-        if periodStart != periodEnd:
-            # Get activated balancing energy from ENTSO-E API, returns a pd dataframe
-            # Maximum period is 1 year, if the period is longer, it is divided into 1 day periods
-            if periodEnd_localtz - periodStart_localtz < timedelta(days=365):
-                df_balancing_energy=self.__get_balancing_energy(periodStart,periodEnd)
-                self.__upload_sql(df_balancing_energy,table_name,periodStart_localtz,periodEnd_localtz)
-
-            else:
-                for day in range((periodEnd_localtz - periodStart_localtz).days):
-                    periodStart_i = periodStart_localtz+ timedelta(days=day)
-                    periodEnd_i = periodStart_localtz + timedelta(days=day+1)
-                    periodStart=self.timezone_manager.get_utc_time(periodStart_i).strftime('%Y%m%d%H%M')
-                    periodEnd=self.timezone_manager.get_utc_time(periodEnd_i).strftime('%Y%m%d%H%M')
-                    
-                    df_balancing_energy=self.__get_balancing_energy(periodStart,periodEnd)
-                    self.__upload_sql(df_balancing_energy,table_name,periodStart_i,periodEnd_i)   
-                
-        else:
-                logger.info(f"{self.schema_name} activated_balancing_prices are up to date! ({(periodStart_localtz+timedelta(-1)).strftime('%Y-%m-%d')})")
-                return "No new data to update"
+        return self.__update('activated_balancing_energy','activated_balancing_prices are')
     
     def update_fuelmix(self):
         '''Refreshes the fuelmix data from the last updated date until recent data'''
-
-        # Get the last timestamp from the database
-        # Set the periodStart and periodEnd for recent data
-        # Convert the local timezone to UTC
-        table_name='fuelmix'
-
-        last_timestamp=self.sql_manager.get_last_row_element(self.schema_name,table_name,self.UTC_column)
-        if last_timestamp is None:
-            last_timestamp=self.data_start_date
-            logger.warning(f"No data found: {self.schema_name} {table_name}, last_timestamp set to: {last_timestamp}")
-        today = datetime.now()
-        periodStart_localtz = datetime(last_timestamp.year,last_timestamp.month,last_timestamp.day,0,0) + timedelta(days=1)
-        periodEnd_localtz = datetime(today.year,today.month,today.day,0,0)
-
-        periodStart=self.timezone_manager.get_utc_time(periodStart_localtz).strftime('%Y%m%d%H%M')
-        periodEnd=self.timezone_manager.get_utc_time(periodEnd_localtz).strftime('%Y%m%d%H%M')
-
-        if periodStart != periodEnd:
-            # Get fuelmix from ENTSO-E API, returns a pd dataframe
-            # Maximum period is 1 year, if the period is longer, it is divided into 1 day periods
-            if periodEnd_localtz - periodStart_localtz < timedelta(days=365):
-                df_fuelmix=self.__get_fuelmix(periodStart,periodEnd)
-                self.__upload_sql(df_fuelmix,table_name,periodStart_localtz,periodEnd_localtz)
-
-            else:
-                for day in range((periodEnd_localtz - periodStart_localtz).days):
-                    periodStart_i = periodStart_localtz+ timedelta(days=day)
-                    periodEnd_i = periodStart_localtz + timedelta(days=day+1)
-                    periodStart=self.timezone_manager.get_utc_time(periodStart_i).strftime('%Y%m%d%H%M')
-                    periodEnd=self.timezone_manager.get_utc_time(periodEnd_i).strftime('%Y%m%d%H%M')
-                    
-                    df_fuelmix=self.__get_fuelmix(periodStart,periodEnd)
-                    self.__upload_sql(df_fuelmix,table_name,periodStart_i,periodEnd_i)   
-        else:
-            logger.info(f"{self.schema_name} fuelmix is up to date! ({(periodStart_localtz+timedelta(-1)).strftime('%Y-%m-%d')})")
-            return "No new data to update"
+        return self.__update('fuelmix','fuelmix is')
         
     def update_actual_total_load(self):
         '''Refreshes the actual total load data from the last updated date until recent data'''
-
-        # Get the last timestamp from the database
-        # Set the periodStart and periodEnd for recent data
-        # Convert the local timezone to UTC
-        table_name='actual_total_load'
-
-        last_timestamp=self.sql_manager.get_last_row_element(self.schema_name,table_name,self.UTC_column)
-        if last_timestamp is None:
-            last_timestamp=self.data_start_date
-            logger.warning(f"No data found: {self.schema_name} {table_name}, last_timestamp set to: {last_timestamp}")
-        today = datetime.now()
-        
-        periodStart_localtz = datetime(last_timestamp.year,last_timestamp.month,last_timestamp.day,0,0) + timedelta(days=1)
-        periodEnd_localtz = datetime(today.year,today.month,today.day,0,0)
-
-        periodStart=self.timezone_manager.get_utc_time(periodStart_localtz).strftime('%Y%m%d%H%M')
-        periodEnd=self.timezone_manager.get_utc_time(periodEnd_localtz).strftime('%Y%m%d%H%M')
-
-        if periodStart != periodEnd:
-            # Get the actual total load from ENTSO-E API, returns a pd dataframe
-            # Maximum period is 1 year, if the period is longer, it is divided into 1 day periods
-            if periodEnd_localtz - periodStart_localtz < timedelta(days=365):
-                df_actual_total_load=self.__get_actual_total_load(periodStart,periodEnd)
-                self.__upload_sql(df_actual_total_load,table_name,periodStart_localtz,periodEnd_localtz)
-
-            else:
-                for day in range((periodEnd_localtz - periodStart_localtz).days):
-                    periodStart_i = periodStart_localtz+ timedelta(days=day)
-                    periodEnd_i = periodStart_localtz + timedelta(days=day+1)
-                    periodStart=self.timezone_manager.get_utc_time(periodStart_i).strftime('%Y%m%d%H%M')
-                    periodEnd=self.timezone_manager.get_utc_time(periodEnd_i).strftime('%Y%m%d%H%M')
-                    
-                    df_actual_total_load=self.__get_actual_total_load(periodStart,periodEnd)
-                    self.__upload_sql(df_actual_total_load,table_name,periodStart_i,periodEnd_i)   
-        else:
-            logger.info(f"{self.schema_name} actual_total_load is up to date! ({(periodStart_localtz+timedelta(-1)).strftime('%Y-%m-%d')})")
-            return "No new data to update"
-
+        return self.__update('actual_total_load','actual_total_load is')
 
     def update_actual_generation_per_unit(self):
         '''Refreshes the CCGT schedules from the last updated date until recent data'''
-        
-        # Get the last timestamp from the database
-        # Set the periodStart and periodEnd for recent data
-        # Convert the local timezone to UTC
-
-        table_name='powerplant_actual_generation'
-
+        return self.__update('powerplant_actual_generation','CCGT schedules are')
+
+    def backfill(self,table_name,periodStart_localtz,periodEnd_localtz):
+        '''Fetches and parses a local period [start, end) of a dataset again even if the payloads are unchanged, the existing rows are replaced'''
+        get_data,upload_data=self.fetchers[table_name]
+        windows=self.plan_windows(table_name,periodStart_localtz,periodEnd_localtz)
+        self.journal.retry_failed(f"{self.schema_name}.{table_name}.backfill")
+        self.__run_windows(table_name,windows,get_data,upload_data,dataset=f"{self.schema_name}.{table_name}.backfill",replace=True,force=True)
+
+    def repair(self,table_name,periodStart_localtz,periodEnd_localtz):
+        '''Re-fetches a local period [start, end) of a dataset day by day, windows with unchanged payloads and existing rows are skipped'''
+        get_data,upload_data=self.fetchers[table_name]
+        windows=self.plan_windows(table_name,periodStart_localtz,periodEnd_localtz,daily=True)
+        self.journal.retry_failed(f"{self.schema_name}.{table_name}.repair")
+        self.__run_windows(table_name,windows,get_data,upload_data,dataset=f"{self.schema_name}.{table_name}.repair",replace=True)
+
+    def refresh_aggregate_history(self,table_name,periodStart_localtz,periodEnd_localtz):
+        '''Computes the hourly, daily and monthly aggregates of a local period [start, end) month by month, for the rows uploaded before the aggregates existed'''
+        if table_name not in self.aggregated_tables:
+            logger.info(f"{self.schema_name} {table_name} has no aggregates")
+            return True
+        success=True
+        month_start=datetime(periodStart_localtz.year,periodStart_localtz.month,1)
+        while month_start < periodEnd_localtz:
+            month_end=datetime(month_start.year+month_start.month//12,month_start.month%12+1,1)
+            # the end of the range is inclusive, the last minute keeps the next month out
+            start_utc=self.timezone_manager.get_utc_time(max(month_start,periodStart_localtz))
+            end_utc=self.timezone_manager.get_utc_time(min(month_end,periodEnd_localtz))-timedelta(minutes=1)
+            if self.sql_manager.refresh_aggregates(self.schema_name,table_name,start_utc,end_utc,self.timezone_manager):
+                logger.info(f"{self.schema_name} {table_name} aggregates refreshed: {month_start.strftime('%Y-%m')}")
+            else:
+                success=False
+            month_start=month_end
+        return success
+
+    def get_failed_windows(self,table_name):
+        '''Returns the windows of a dataset that failed the validation too many times, with their last validation result'''
+        return self.journal.get_failed(f"{self.schema_name}.{table_name}")
+
+    def retry_failed_windows(self,table_name):
+        '''Makes the failed update windows of a dataset pending again, they are fetched on the next update'''
+        return self.journal.retry_failed(f"{self.schema_name}.{table_name}")
+
+    def partition_tables(self,table_name,interval=None):
+        '''Migrates the tables of a dataset to partitions on "UTC", by default with their configured interval'''
+        results=[self.sql_manager.partition_table(self.schema_name,partitioned_table,interval or self.partition_intervals[partitioned_table])
+                 for partitioned_table in (table_name,f'{table_name}_native') if partitioned_table in self.partition_intervals]
+        return all(results)
+
+    def plan_reprocess(self,table_name,periodStart_localtz=None,periodEnd_localtz=None):
+        '''Returns the archived request windows of a dataset inside a local period [start, end) (None: unbounded), in fetch order'''
+        periodStart=self.timezone_manager.get_utc_time(periodStart_localtz).strftime('%Y%m%d%H%M') if periodStart_localtz else None
+        periodEnd=self.timezone_manager.get_utc_time(periodEnd_localtz).strftime('%Y%m%d%H%M') if periodEnd_localtz else None
+        windows=[]
+        for periodStart_i,periodEnd_i in self.archive.get_windows(self.schema_name,self.document_types[table_name],periodStart,periodEnd):
+            local_bounds=[pd.Timestamp(datetime.strptime(period,'%Y%m%d%H%M'),tz='UTC').tz_convert(self.timezone_manager.local_tz).tz_localize(None).to_pydatetime() for period in (periodStart_i,periodEnd_i)]
+            windows.append((periodStart_i,periodEnd_i,*local_bounds))
+        return windows
+
+    def reprocess(self,table_name,periodStart_localtz=None,periodEnd_localtz=None,workers=None):
+        '''Parses the archived payloads of a dataset again with the current fetchers and replaces the rows, without calling the ENTSO-E API.
+        The windows are parsed in parallel by offline DataManagers in worker processes and uploaded in order.'''
+        dataset=f"{self.schema_name}.{table_name}.reprocess"
+        windows=self.plan_reprocess(table_name,periodStart_localtz,periodEnd_localtz)
+        if not windows:
+            logger.info(f"No archived {self.schema_name} {table_name} payloads to reprocess")
+            return "No archived data to reprocess"
+
+        self.journal.plan(dataset,windows)
+        # spawned workers start with their own diagnostics writer, archive and database connections, forked ones would inherit them broken
+        with ProcessPoolExecutor(max_workers=workers,mp_context=multiprocessing.get_context('spawn'),initializer=init_reprocess_worker,initargs=(self.schema_name,self.timezone_manager.local_tz.zone)) as pool:
+            futures={(periodStart,periodEnd): pool.submit(reprocess_window,table_name,periodStart,periodEnd) for periodStart,periodEnd,_,_ in self.journal.get_pending(dataset)}
+            upload_data=self.fetchers[table_name][1]
+            # windows left over by an interrupted reprocessing of another period are parsed on demand
+            get_data=lambda periodStart,periodEnd: (futures.get((periodStart,periodEnd)) or pool.submit(reprocess_window,table_name,periodStart,periodEnd)).result()
+            self.__run_windows(table_name,windows,get_data,upload_data,dataset=dataset,replace=True)
+
+    def refresh_revisions(self,table_name,days=3):
+        '''Re-fetches the last days of a dataset to pick up revisions, windows with unchanged payloads are skipped'''
         last_timestamp=self.sql_manager.get_last_row_element(self.schema_name,table_name,self.UTC_column)
         if last_timestamp is None:
-            last_timestamp=self.data_start_date
-            logger.warning(f"No data found: {self.schema_name} {table_name}, last_timestamp set to: {last_timestamp}")
-        today = datetime.now()
-
-        periodStart_localtz = datetime(last_timestamp.year,last_timestamp.month,last_timestamp.day,0,0) + timedelta(days=1)
-        periodEnd_localtz = datetime(today.year,today.month,today.day,0,0)
-
-        periodStart=self.timezone_manager.get_utc_time(periodStart_localtz).strftime('%Y%m%d%H%M')
-        periodEnd=self.timezone_manager.get_utc_time(periodEnd_localtz).strftime('%Y%m%d%H%M')
-  
-
-        if periodStart != periodEnd:
-            # Get schedule from ENTSO-E API, returns a pd dataframe
-            # Maximum period is    !!! 1 DAY !!!    if the period is longer, it is divided into 1 day periods
-            for day in range((periodEnd_localtz - periodStart_localtz).days):
-                periodStart_i = periodStart_localtz+ timedelta(days=day)
-                periodEnd_i = periodStart_localtz + timedelta(days=day+1)
-                periodStart = self.timezone_manager.get_utc_time(periodStart_i).strftime('%Y%m%d%H%M')
-                periodEnd = self.timezone_manager.get_utc_time(periodEnd_i).strftime('%Y%m%d%H%M')
-
-                # handle days with 25 hours
-                if self.timezone_manager.get_utc_time(periodEnd_i) - self.timezone_manager.get_utc_time(periodStart_i) <= timedelta(hours=24):
-                    df_ccgt_schedules=self.__get_ccgt_actual_generation(periodStart,periodEnd)
-                    self.__upload_sql(df_ccgt_schedules,table_name,periodStart_i,periodEnd_i)
-                elif self.timezone_manager.get_utc_time(periodEnd_i) - self.timezone_manager.get_utc_time(periodStart_i) == timedelta(hours=25):
-                    start_hours=[0,23]
-                    end_hours=[23,24]
-                    print(f"periodStart: {periodStart}, periodEnd: {periodEnd} 25 hours")
-                    for i in range(len(start_hours)):
-                        periodStart = self.timezone_manager.get_utc_time(periodStart_i + timedelta(hours=start_hours[i])).strftime('%Y%m%d%H%M')
-                        periodEnd = self.timezone_manager.get_utc_time(periodStart_i + timedelta(hours=end_hours[i])).strftime('%Y%m%d%H%M')
-                        print(f"periodStart: {periodStart}, periodEnd: {periodEnd}")
-                        df_ccgt_schedules=self.__get_ccgt_actual_generation(periodStart,periodEnd)
-                        self.__upload_sql(df_ccgt_schedules,table_name,periodStart_i,periodEnd_i)
-                else:
-                    logger.error(f"Error while getting {self.schema_name} CCGT schedules: {self.timezone_manager.get_utc_time(periodStart_i)} - {self.timezone_manager.get_utc_time(periodEnd_i)}")
-        else:
-            logger.info(f"{self.schema_name} CCGT schedules are up to date! ({(periodStart_localtz+timedelta(-1)).strftime('%Y-%m-%d')})")
-            return "No new data to update"
+            logger.warning(f"No data found: {self.schema_name} {table_name}, nothing to refresh")
+            return "No data to refresh"
+        last_timestamp=pd.Timestamp(last_timestamp)
+        periodEnd_localtz = datetime(last_timestamp.year,last_timestamp.month,last_timestamp.day,0,0) + timedelta(days=1)
+        periodStart_localtz = periodEnd_localtz - timedelta(days=days)
+
+        # the refreshed rows are replaced, the revision windows have their own journal
+        get_data,upload_data=self.fetchers[table_name]
+        windows=self.__plan_daily_windows(periodStart_localtz,periodEnd_localtz)
+        self.__run_windows(table_name,windows,get_data,upload_data,dataset=f"{self.schema_name}.{table_name}.revision",replace=True)
+
+    def is_up_to_date(self,table_name,expected_end_localtz):
+        '''Checks if the last row of a table reaches the last hour before the expected local end'''
+        last_timestamp=self.sql_manager.get_last_row_element(self.schema_name,table_name,self.UTC_column)
+        if last_timestamp is None:
+            return False
+        last_timestamp=pd.Timestamp(last_timestamp)
+        if last_timestamp.tzinfo is not None:
+            last_timestamp=last_timestamp.tz_convert('UTC').tz_localize(None)
+        return last_timestamp >= self.timezone_manager.get_utc_time(expected_end_localtz).replace(tzinfo=None) - timedelta(hours=1)
+
+    def poll(self,table_names):
+        '''Runs the updates of the given datasets that are due and their daily revision refresh, returns the seconds until the next one is due'''
+        now=datetime.now(self.timezone_manager.local_tz).replace(tzinfo=None)
+        for table_name in table_names:
+            if self.next_poll.get(table_name,now) > now:
+                continue
+            update,schedule=self.datasets[table_name]
+            try:
+                update()
+                up_to_date=self.is_up_to_date(table_name,schedule.get_expected_end(now))
+                # revisions of the last days are picked up once a day, after the dataset is up to date
+                if up_to_date and self.last_revision_refresh.get(table_name) != now.date():
+                    self.refresh_revisions(table_name)
+                    self.last_revision_refresh[table_name]=now.date()
+            except Exception as e:
+                logger.error(f"Error while polling {self.schema_name} {table_name}: {e}")
+                up_to_date=False
+            self.next_poll[table_name]=schedule.get_next_poll(now,up_to_date)
+            logger.info(f"{self.schema_name} {table_name} next poll: {self.next_poll[table_name].strftime('%Y-%m-%d %H:%M')}")
+
+        now=datetime.now(self.timezone_manager.local_tz).replace(tzinfo=None)
+        return max(0,min((self.next_poll[table_name]-now).total_seconds() for table_name in table_names))
+
+
+# offline DataManager of a reprocessing worker process
+reprocess_data_manager=None
+
+def init_reprocess_worker(schema,local_timezone):
+    global reprocess_data_manager
+    reprocess_data_manager=DataManager(schema,local_timezone,offline=True)
+
+def reprocess_window(table_name,periodStart,periodEnd):
+    '''Parses the archived payloads of a request window, an empty dataframe is quarantined by the validation'''
+    try:
+        return reprocess_data_manager.fetchers[table_name][0](periodStart,periodEnd)
+    except Exception as e:
+        logger.error(f"Error while reprocessing {reprocess_data_manager.schema_name} {table_name} {periodStart}-{periodEnd}: {e}")
+        return pd.DataFrame()
+    finally:
+        # worker processes exit without atexit handlers, the dumps of the window are written before it is returned
+        reprocess_data_manager.diagnostics.flush()
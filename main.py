@@ -1,7 +1,37 @@
+import time
 import logging
-from data_manager import DataManager
+import argparse
+from datetime import datetime
+
+# datasets refreshed for each area
+AREAS = {
+    "HUN" : ['power_price', 'activated_balancing_energy', 'fuelmix', 'actual_total_load', 'powerplant_actual_generation'],
+    "GER" : ['power_price'],
+}
+
+def get_data_managers(areas):
+    '''Creates the DataManagers of the areas, pandas, sqlalchemy and the API clients are loaded with the first one'''
+    from data_manager import DataManager
+    return {schema: DataManager(schema=schema, local_timezone='CET') for schema in areas}
+
+def get_selection(args):
+    '''Returns the selected datasets of every selected area'''
+    areas=args.areas or list(AREAS)
+    for schema in areas:
+        if schema not in AREAS:
+            raise SystemExit(f"Unknown area: {schema} (known areas: {', '.join(AREAS)})")
+    for table_name in args.datasets or []:
+        if not any(table_name in AREAS[schema] for schema in areas):
+            raise SystemExit(f"Unknown dataset: {table_name} (datasets of the areas: {', '.join(sorted(set(t for schema in areas for t in AREAS[schema])))})")
+    return {schema: [table_name for table_name in AREAS[schema] if not args.datasets or table_name in args.datasets] for schema in areas}
+
+def print_windows(schema, table_name, windows):
+    print(f"{schema} {table_name}: {len(windows)} window(s)")
+    for periodStart, periodEnd, periodStart_localtz, periodEnd_localtz in windows:
+        print(f"  {periodStart} - {periodEnd} UTC ({periodStart_localtz.strftime('%Y-%m-%d %H:%M')} - {periodEnd_localtz.strftime('%Y-%m-%d %H:%M')} local)")
 
 def main():
+    from data_manager import DataManager
     try:
         entsoe_H = DataManager(schema="HUN", local_timezone='CET')
         entsoe_H.update_power_prices()
@@ -9,12 +39,133 @@ def main():
         entsoe_H.update_fuelmix()
         entsoe_H.update_actual_total_load()
         entsoe_H.update_actual_generation_per_unit()
-    
+
         entsoe_D = DataManager(schema="GER", local_timezone='CET')
         entsoe_D.update_power_prices()
     except Exception as e:
         logging.error(f"Error: {e}")
         raise e
-  
+
+def run_update(args):
+    '''Updates the selected datasets from their last row until their last published day'''
+    selection=get_selection(args)
+    for schema, data_manager in get_data_managers(selection).items():
+        for table_name in selection[schema]:
+            if args.dry_run:
+                print_windows(schema, table_name, data_manager.plan_update(table_name)[2])
+            else:
+                data_manager.datasets[table_name][0]()
+
+def run_backfill(args):
+    '''Fetches the selected datasets again in the given local date range, the existing rows are replaced'''
+    selection=get_selection(args)
+    for schema, data_manager in get_data_managers(selection).items():
+        for table_name in selection[schema]:
+            if args.dry_run:
+                print_windows(schema, table_name, data_manager.plan_windows(table_name, args.start, args.end))
+            else:
+                data_manager.backfill(table_name, args.start, args.end)
+
+def run_repair(args):
+    '''Re-fetches the selected datasets day by day in the given local date range, unchanged days are skipped'''
+    selection=get_selection(args)
+    for schema, data_manager in get_data_managers(selection).items():
+        for table_name in selection[schema]:
+            if args.dry_run:
+                print_windows(schema, table_name, data_manager.plan_windows(table_name, args.start, args.end, daily=True))
+            else:
+                data_manager.repair(table_name, args.start, args.end)
+
+def run_revisions(args):
+    '''Re-fetches the last days of the selected datasets and replaces the revised ones, the daemon does this once a day'''
+    selection=get_selection(args)
+    for schema, data_manager in get_data_managers(selection).items():
+        for table_name in selection[schema]:
+            data_manager.refresh_revisions(table_name, args.days)
+
+def run_aggregates(args):
+    '''Computes the aggregates of the selected datasets in the given local date range month by month'''
+    selection=get_selection(args)
+    for schema, data_manager in get_data_managers(selection).items():
+        for table_name in selection[schema]:
+            data_manager.refresh_aggregate_history(table_name, args.start, args.end)
+
+def run_failed(args):
+    '''Lists the windows that failed the validation too many times, with --retry the update windows are fetched again on the next update'''
+    selection=get_selection(args)
+    for schema, data_manager in get_data_managers(selection).items():
+        for table_name in selection[schema]:
+            for dataset, periodStart, periodEnd, attempts, validation in data_manager.get_failed_windows(table_name):
+                issues='; '.join(validation['issues']) if validation else ''
+                print(f"{dataset} {periodStart} - {periodEnd} UTC, {attempts} attempts: {issues}")
+            if args.retry:
+                print(f"{schema} {table_name}: {data_manager.retry_failed_windows(table_name)} window(s) planned again")
+
+def run_partition(args):
+    '''Migrates the tables of the selected datasets to partitions on "UTC", new tables are created partitioned on their first upload'''
+    selection=get_selection(args)
+    for schema, data_manager in get_data_managers(selection).items():
+        for table_name in selection[schema]:
+            data_manager.partition_tables(table_name, args.interval)
+
+def run_reprocess(args):
+    '''Parses the archived payloads of the selected datasets again and replaces their rows, the ENTSO-E API is not called'''
+    selection=get_selection(args)
+    for schema, data_manager in get_data_managers(selection).items():
+        for table_name in selection[schema]:
+            if args.dry_run:
+                print_windows(schema, table_name, data_manager.plan_reprocess(table_name, args.start, args.end))
+            else:
+                data_manager.reprocess(table_name, args.start, args.end, args.workers)
+
+def run_daemon(args=None):
+    '''Keeps the DataManagers, their DB pools and caches warm and polls every dataset around its publication time'''
+    selection=get_selection(args) if args is not None else AREAS
+    data_managers = get_data_managers(selection)
+    while True:
+        sleep_seconds = min(data_manager.poll(selection[schema]) for schema, data_manager in data_managers.items())
+        time.sleep(sleep_seconds)
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Loads ENTSO-E transparency data into the PostgreSQL schemas of the areas. Without a command every dataset is updated.")
+    commands = parser.add_subparsers(dest="command")
+
+    def add_command(name, function, help, date_range=False, dry_run=True, optional_range=False):
+        command = commands.add_parser(name, help=help, description=help)
+        command.add_argument("--areas", nargs="+", metavar="AREA", help=f"areas to process (default: all, {', '.join(AREAS)})")
+        command.add_argument("--datasets", nargs="+", metavar="DATASET", help="datasets to process (default: all datasets of the areas)")
+        if date_range:
+            command.add_argument("--start", required=not optional_range, type=parse_date, help="first local day, YYYY-MM-DD")
+            command.add_argument("--end", required=not optional_range, type=parse_date, help="local day after the last one, YYYY-MM-DD")
+        if dry_run:
+            command.add_argument("--dry-run", action="store_true", help="print the planned request windows without fetching anything")
+        command.set_defaults(function=function)
+        return command
+
+    add_command("update", run_update, "update datasets from their last row until their last published day")
+    add_command("backfill", run_backfill, "fetch and parse a date range again, even if unchanged, and replace the existing rows", date_range=True)
+    add_command("repair", run_repair, "re-fetch a date range day by day, days with unchanged payloads and existing rows are skipped", date_range=True)
+    revisions = add_command("revisions", run_revisions, "re-fetch the last days of the datasets and replace the revised ones", dry_run=False)
+    revisions.add_argument("--days", type=int, default=3, help="number of days before the last row (default: 3)")
+    add_command("aggregates", run_aggregates, "compute the hourly, daily and monthly aggregates of a date range, e.g. the history before the aggregates existed", date_range=True, dry_run=False)
+    failed = add_command("failed", run_failed, "list the windows that failed the validation too many times", dry_run=False)
+    failed.add_argument("--retry", action="store_true", help="plan the failed update windows again, backfill and repair retry their own on every run")
+    partition = add_command("partition", run_partition, "migrate existing tables to monthly or yearly partitions on UTC", dry_run=False)
+    partition.add_argument("--interval", choices=["month", "year"], help="partitioning interval (default: the interval configured for the table)")
+    reprocess = add_command("reprocess", run_reprocess, "parse the archived payloads again and replace the rows, without calling the API", date_range=True, optional_range=True)
+    reprocess.add_argument("--workers", type=int, help="parsing processes (default: number of CPUs)")
+    add_command("daemon", run_daemon, "keep running, poll every dataset around its publication time and refresh its revisions daily", dry_run=False)
+    return parser
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {value} (format: YYYY-MM-DD)")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = get_parser().parse_args()
+    if args.command is None:
+        main()
+    else:
+        args.function(args)
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+TEMP_DIR = tempfile.mkdtemp()
+os.environ.setdefault('ENTSOE_JOURNAL_DIR', os.path.join(TEMP_DIR, 'journal'))
+os.environ.setdefault('ENTSOE_ARCHIVE_DIR', os.path.join(TEMP_DIR, 'archive'))
+os.environ.setdefault('ENTSOE_DIAGNOSTICS_DIR', os.path.join(TEMP_DIR, 'troubleshoot'))
+
+import numpy as np
+import pandas as pd
+import requests
+
+from data_manager import DataManager
+
+
+def get_period(start, end, quantities, resolution='PT60M'):
+    points = ''.join(f'<Point><position>{position}</position><quantity>{quantity}</quantity></Point>' for position, quantity in enumerate(quantities, 1))
+    return f'<Period><timeInterval><start>{start}</start><end>{end}</end></timeInterval><resolution>{resolution}</resolution>{points}</Period>'
+
+def get_response(content):
+    response = requests.models.Response()
+    response._content = content.encode()
+    response.status_code = 200
+    response.headers = {'Content-Type': 'application/xml'}
+    return response
+
+
+class TestFuelmix(unittest.TestCase):
+    '''A psr type with a gap is split into several TimeSeries, every segment is kept'''
+    def setUp(self):
+        self.data_manager = DataManager(schema="HUN", local_timezone='CET')
+        self.data_manager.sql_manager.get_column_names = lambda schema_name, table_name: pd.DataFrame({'column_name': ['UTC', 'local_datetime', 'Fossil_Gas', 'Nuclear']})
+
+    def test_two_segment_psr_type(self):
+        gas_1 = get_period('2025-03-01T23:00Z', '2025-03-02T05:00Z', range(100, 106))
+        gas_2 = get_period('2025-03-02T07:00Z', '2025-03-02T23:00Z', range(200, 216))
+        nuclear = get_period('2025-03-01T23:00Z', '2025-03-02T23:00Z', [1900] * 24)
+        document = ('<?xml version="1.0"?><GL_MarketDocument>'
+                    + ''.join(f'<TimeSeries><curveType>A01</curveType><MktPSRType><psrType>{psr_type}</psrType></MktPSRType>{period}</TimeSeries>'
+                              for psr_type, period in (('B04', gas_1), ('B14', nuclear), ('B04', gas_2)))
+                    + '</GL_MarketDocument>')
+
+        with mock.patch.object(DataManager, '_DataManager__request_entsoe_response', lambda self, params: get_response(document)):
+            df = self.data_manager.fetchers['fuelmix'][0]('202503012300', '202503022300')
+
+        self.assertEqual(len(df), 24)
+        np.testing.assert_array_equal(df['Fossil_Gas'].to_numpy()[:6], np.arange(100, 106))
+        self.assertTrue(df['Fossil_Gas'].iloc[6:8].isna().all())
+        np.testing.assert_array_equal(df['Fossil_Gas'].to_numpy()[8:], np.arange(200, 216))
+        np.testing.assert_array_equal(df['Nuclear'].to_numpy(), np.full(24, 1900))
+
+    def test_absent_psr_type(self):
+        nuclear = get_period('2025-03-01T23:00Z', '2025-03-02T23:00Z', [1900] * 96, 'PT15M')
+        gas = get_period('2025-03-01T23:00Z', '2025-03-02T23:00Z', [300] * 96, 'PT15M')
+        document = ('<?xml version="1.0"?><GL_MarketDocument>'
+                    + ''.join(f'<TimeSeries><curveType>A01</curveType><MktPSRType><psrType>{psr_type}</psrType></MktPSRType>{period}</TimeSeries>'
+                              for psr_type, period in (('B04', gas), ('B14', nuclear)))
+                    + '</GL_MarketDocument>')
+        self.data_manager.sql_manager.get_column_names = lambda schema_name, table_name: pd.DataFrame({'column_name': ['UTC', 'local_datetime', 'Biomass', 'Fossil_Gas', 'Nuclear']})
+
+        with mock.patch.object(DataManager, '_DataManager__request_entsoe_response', lambda self, params: get_response(document)):
+            df = self.data_manager.fetchers['fuelmix'][0]('202503012300', '202503022300')
+        validation = self.data_manager.validator.validate(df, '202503012300', '202503022300', self.data_manager.validation_rules['fuelmix'])
+
+        self.assertTrue((df['Biomass'] == 0).all())
+        self.assertTrue(validation['passed'], validation['issues'])
+        self.assertEqual(validation['warnings'], ['Biomass not in the response, filled with 0s'])
+
+
+class TestDataValidator(unittest.TestCase):
+    '''The row count is checked against the expected resolution of the dataset, not the step of the frame'''
+    def setUp(self):
+        self.data_manager = DataManager(schema="HUN", local_timezone='CET')
+        self.rules = self.data_manager.validation_rules['actual_total_load']
+
+    def get_frame(self, periods, freq):
+        utc = pd.date_range('2025-03-01 23:00', periods=periods, freq=freq, tz='UTC')
+        return pd.DataFrame({'UTC': utc, 'local_datetime': utc.tz_convert('CET'), 'Actual_load': 4000.0})
+
+    def test_expected_resolution(self):
+        self.assertTrue(self.data_manager.validator.validate(self.get_frame(96, '15min'), '202503012300', '202503022300', self.rules)['passed'])
+
+    def test_hourly_frame_of_a_quarter_hourly_dataset(self):
+        validation = self.data_manager.validator.validate(self.get_frame(24, '60min'), '202503012300', '202503022300', self.rules)
+        self.assertFalse(validation['passed'])
+        self.assertEqual(validation['expected_rows'], 96)
+
+    def test_single_row(self):
+        self.assertFalse(self.data_manager.validator.validate(self.get_frame(1, '1D'), '202503012300', '202503022300', self.rules)['passed'])
+
+
+if __name__ == '__main__':
+    unittest.main()